@@ -33,35 +33,158 @@
 import sys
 import time
 import os
-import shutil
 
 INTERIM_DIR = '/var/tmp/linux_metrics'
 if not os.path.exists(INTERIM_DIR):
     os.makedirs(INTERIM_DIR)
 
+PROC_STATES = {
+    b'R': 'running',
+    b'S': 'sleeping',
+    b'D': 'waiting',
+    b'Z': 'zombie'
+}
+
+NET_ERROR_FIELDS = {
+    2: 'r_errs',
+    3: 'r_drop',
+    4: 'r_fifo',
+    5: 'r_frame',
+    10: 't_errs',
+    11: 't_drop',
+    12: 't_fifo',
+    13: 't_colls',
+    14: 't_carrier'
+}
+
+MEMINFO_MAX_AGE = 0.05
+_meminfo_cache = None
+
+
+def read_file(path):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        chunks = []
+        while True:
+            chunk = os.read(fd, 65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+    finally:
+        os.close(fd)
+    return b''.join(chunks)
+
+def write_snapshot(interim, data):
+    # The first line of an interim file is the time the snapshot was taken.
+    # Write and rename, so a concurrent run never reads a partial snapshot;
+    # the temporary name is per process so two runs never share it.
+    tmp_file = f"{interim}.{os.getpid()}.tmp"
+    fd = os.open(tmp_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        try:
+            os.write(fd, f"{time.time()}\n".encode() + data)
+        finally:
+            os.close(fd)
+        os.rename(tmp_file, interim)
+    except OSError:
+        os.unlink(tmp_file)
+        raise
+
+def read_snapshot(interim):
+    try:
+        fd = os.open(interim, os.O_RDONLY)
+    except FileNotFoundError:
+        return None
+    try:
+        # Unlike /proc files, the interim file has a real size, so one read gets it all
+        content = os.read(fd, os.fstat(fd).st_size)
+    finally:
+        os.close(fd)
+    stamp, _, data = content.partition(b'\n')
+    try:
+        sample_period = time.time() - float(stamp)
+    except ValueError:
+        # Interim file from an older version without the timestamp line
+        return None
+    return sample_period, data
+
+def find_line(content, key, last=False):
+    # key has to start a line, after the padding that /proc/net/dev right-aligns names with.
+    # With last=True the search runs from the end, for lines near the tail of the file.
+    if last:
+        i = content.rfind(key)
+        while i > 0 and content[i - 1] not in b' \n':
+            i = content.rfind(key, 0, i + len(key) - 1)
+    else:
+        i = content.find(key)
+        while i > 0 and content[i - 1] not in b' \n':
+            i = content.find(key, i + 1)
+    if i < 0:
+        return None
+    j = content.find(b'\n', i)
+    return content[i:j] if j >= 0 else content[i:]
+
+def parse_threshold(value):
+    # List thresholds may contain '' for positions that were left out
+    if value is None:
+        return None
+    if isinstance(value, list):
+        return [float(x) if x != '' else None for x in value]
+    return float(value)
+
+def counters(line, key):
+    return [int(x) for x in line.split(key, 1)[1].split()]
+
+def counter_deltas(now, prev):
+    return [b - a for a, b in zip(prev, now)]
+
+def read_meminfo(*fields):
+    # Values are in kB; a missing field is left out of the returned dict.
+    # Callers in the same process within MEMINFO_MAX_AGE share one read.
+    global _meminfo_cache
+    pid = os.getpid()
+    now = time.monotonic()
+    if _meminfo_cache is None or _meminfo_cache[0] != pid or now - _meminfo_cache[1] >= MEMINFO_MAX_AGE:
+        _meminfo_cache = (pid, now, read_file('/proc/meminfo'))
+    content = _meminfo_cache[2]
+    values = {}
+    for field in fields:
+        key = f"{field}:".encode()
+        line = find_line(content, key)
+        if line is not None:
+            values[field] = int(line.split()[1])
+    return values
+
 
 def check_cpu(warn=None, crit=None):
     status_code = 3
     status_outp = ''
     perfdata = ''
+    warn_f = parse_threshold(warn)
+    crit_f = parse_threshold(crit)
 
-    interim_file = os.path.join(INTERIM_DIR, 'proc_stat')
-    if not os.path.isfile(interim_file):
-        shutil.copyfile('/proc/stat', interim_file)
-        print('This was the first run, run again to get values')
-        sys.exit(0)
+    proc_content = read_file('/proc/stat')
 
-    sample_period = float(time.time() - os.path.getmtime(interim_file))
+    interim_file = os.path.join(INTERIM_DIR, 'proc_stat')
+    interim = read_snapshot(interim_file)
+    if interim is None:
+        if warn is not None and crit is not None:
+            write_snapshot(interim_file, proc_content)
+            print('This was the first run, run again to get values')
+            sys.exit(0)
+        # Without thresholds report zeros right away; the snapshot is written below
+        interim = (0.0, proc_content)
 
-    with open(interim_file, 'r') as f1:
-        line1 = f1.readline()
+    sample_period, interim_content = interim
 
-    with open('/proc/stat', 'r') as f2:
-        line2 = f2.readline()
+    line1 = interim_content.split(b'\n', 1)[0]
+    line2 = proc_content.split(b'\n', 1)[0]
 
-    deltas = [int(b) - int(a) for a, b in zip(line1.split()[1:], line2.split()[1:])]
+    deltas = counter_deltas(counters(line2, b'cpu'), counters(line1, b'cpu'))
+    # Guard against two calls within the same clock tick
     total = sum(deltas)
-    percents = [100 - (100 * (float(total - x) / total)) for x in deltas]
+    scale = 100.0 / total if total else 0
+    percents = [x * scale for x in deltas]
 
     cpu_pcts = {
         'user': percents[0],
@@ -77,15 +200,15 @@ def check_cpu(warn=None, crit=None):
     else:
         cpu_pcts['steal'] = 0
 
-    cpu_pcts['cpu'] = 100 - cpu_pcts['idle']
+    cpu_pcts['cpu'] = 100 - cpu_pcts['idle'] if total else 0
 
     status_outp = f"CPU Usage: {cpu_pcts['cpu']:.2f}% [t:{sample_period:.2f}]"
 
     if warn is not None and crit is not None:
-        if float(cpu_pcts['cpu']) >= float(crit):
+        if cpu_pcts['cpu'] >= crit_f:
             status_code = 2
             status_outp += ' (Critical)'
-        elif float(cpu_pcts['cpu']) >= float(warn):
+        elif cpu_pcts['cpu'] >= warn_f:
             status_code = 1
             status_outp += ' (Warning)'
         else:
@@ -94,15 +217,16 @@ def check_cpu(warn=None, crit=None):
     else:
         status_code = 0
 
+    parts = []
     for x in ['cpu', 'user', 'system', 'iowait', 'nice', 'irq', 'softirq', 'steal']:
-        perfdata += f"{x}={cpu_pcts[x]:.2f}%"
+        item = f"{x}={cpu_pcts[x]:.2f}%"
         if warn is not None and crit is not None:
-            perfdata += f";{warn};{crit}"
-        perfdata += ' '
+            item += f";{warn};{crit}"
+        parts.append(item)
 
-    perfdata = perfdata.strip()
+    perfdata = ' '.join(parts)
 
-    shutil.copyfile('/proc/stat', interim_file)
+    write_snapshot(interim_file, proc_content)
 
     print(f"{status_outp} | {perfdata}")
     sys.exit(status_code)
@@ -111,6 +235,8 @@ def check_load(warn=None, crit=None):
     status_code = 3
     status_outp = ''
     perfdata = ''
+    warn_f = parse_threshold(warn)
+    crit_f = parse_threshold(crit)
 
     with open('/proc/loadavg', 'r') as f:
         line = f.readline()
@@ -128,10 +254,10 @@ def check_load(warn=None, crit=None):
         status_code = 0
         for i in range(len(warn)):
             if crit[i] and warn[i]:
-                if float(load_avgs[i]) >= float(crit[i]):
+                if load_avgs[i] >= crit_f[i]:
                     status_code = 2
                     status_outp += ' (Critical)'
-                elif float(load_avgs[i]) >= float(warn[i]):
+                elif load_avgs[i] >= warn_f[i]:
                     if status_code < 1:
                         status_code = 1
                     status_outp += ' (Warning)'
@@ -140,16 +266,17 @@ def check_load(warn=None, crit=None):
     else:
         status_code = 0
 
+    parts = []
     seq = 0
     for x in ['load1', 'load5', 'load15']:
-        perfdata += f"{x}={load[x]:.2f}"
+        item = f"{x}={load[x]:.2f}"
         if warn is not None and crit is not None:
             if len(warn) >= seq + 1:
-                perfdata += f";{warn[seq]};{crit[seq]}"
-        perfdata += ' '
+                item += f";{warn[seq]};{crit[seq]}"
+        parts.append(item)
         seq += 1
 
-    perfdata = perfdata.strip()
+    perfdata = ' '.join(parts)
 
     print(f"{status_outp} | {perfdata}")
     sys.exit(status_code)
@@ -158,6 +285,8 @@ def check_threads(warn=None, crit=None):
     status_code = 3
     status_outp = ''
     perfdata = ''
+    warn_f = parse_threshold(warn)
+    crit_f = parse_threshold(crit)
 
     with open('/proc/loadavg', 'r') as f:
         line = f.readline()
@@ -170,10 +299,10 @@ def check_threads(warn=None, crit=None):
     status_outp = f"Threads: {t}"
 
     if warn is not None and crit is not None:
-        if threads['running'] >= int(crit):
+        if threads['running'] >= crit_f:
             status_code = 2
             status_outp += ' (Critical)'
-        elif threads['running'] >= int(warn):
+        elif threads['running'] >= warn_f:
             status_code = 1
             status_outp += ' (Warning)'
         else:
@@ -182,13 +311,14 @@ def check_threads(warn=None, crit=None):
     else:
         status_code = 0
 
+    parts = []
     for x in ['running', 'total']:
-        perfdata += f"{x}={threads[x]:.2f}"
+        item = f"{x}={threads[x]:.2f}"
         if warn is not None and crit is not None and x == 'running':
-            perfdata += f";{warn};{crit}"
-        perfdata += ' '
+            item += f";{warn};{crit}"
+        parts.append(item)
 
-    perfdata = perfdata.strip()
+    perfdata = ' '.join(parts)
 
     print(f"{status_outp} | {perfdata}")
     sys.exit(status_code)
@@ -197,6 +327,8 @@ def check_openfiles(warn=None, crit=None):
     status_code = 3
     status_outp = ''
     perfdata = ''
+    warn_f = parse_threshold(warn)
+    crit_f = parse_threshold(crit)
 
     with open('/proc/sys/fs/file-nr', 'r') as f:
         line = f.readline()
@@ -211,10 +343,10 @@ def check_openfiles(warn=None, crit=None):
     status_outp = f"Open Files: {ofiles['open']} (free: {ofiles['free']})"
 
     if warn is not None and crit is not None:
-        if float(ofiles['open']) >= float(crit):
+        if ofiles['open'] >= crit_f:
             status_code = 2
             status_outp += ' (Critical)'
-        elif float(ofiles['open']) >= float(warn):
+        elif ofiles['open'] >= warn_f:
             status_code = 1
             status_outp += ' (Warning)'
         else:
@@ -223,13 +355,14 @@ def check_openfiles(warn=None, crit=None):
     else:
         status_code = 0
 
+    parts = []
     for x in ['open', 'free']:
-        perfdata += f"{x}={ofiles[x]:.2f}"
+        item = f"{x}={ofiles[x]:.2f}"
         if warn is not None and crit is not None and x == 'open':
-            perfdata += f";{warn};{crit};0;{ofiles['total']}"
-        perfdata += ' '
+            item += f";{warn};{crit};0;{ofiles['total']}"
+        parts.append(item)
 
-    perfdata = perfdata.strip()
+    perfdata = ' '.join(parts)
 
     print(f"{status_outp} | {perfdata}")
     sys.exit(status_code)
@@ -238,44 +371,26 @@ def check_procs(warn=None, crit=None):
     status_code = 3
     status_outp = ''
     perfdata = ''
+    warn_f = parse_threshold(warn)
+    crit_f = parse_threshold(crit)
+
+    proc_content = read_file('/proc/stat')
+    curr_forks = counters(find_line(proc_content, b'processes ', last=True), b'processes ')[0]
 
-    forks = 0
+    # Only the fork counter is kept in the interim file, not the whole /proc/stat
     interim_file = os.path.join(INTERIM_DIR, 'proc_stat_processes')
-    if not os.path.isfile(interim_file):
-        shutil.copyfile('/proc/stat', interim_file)
+    interim = read_snapshot(interim_file)
+    if interim is None:
+        write_snapshot(interim_file, f"{curr_forks}\n".encode())
         print('This was the first run, run again to get values')
         sys.exit(0)
 
-    sample_period = float(time.time() - os.path.getmtime(interim_file))
-
-    curr_forks = 0
-    for file in ['/proc/stat', interim_file]:
-        with open(file, 'r') as f:
-            for line in f:
-                if line.startswith('processes '):
-                    if file == '/proc/stat':
-                        curr_forks = int(line.split()[1])
-                    elif file == interim_file:
-                        forks = curr_forks - int(line.split()[1])
+    sample_period, interim_content = interim
+    forks = curr_forks - int(interim_content)
 
     forks_ps = float(forks / sample_period)
-    states_procs = {}
-    p_total = 0
-
-    for proc_dir in os.listdir('/proc'):
-        if proc_dir.isdigit():
-            p_total += 1
-            try:
-                with open(f'/proc/{proc_dir}/stat', 'r') as f:
-                    line = f.readline().split()[1:3]
-            except:
-                continue
-            if line[1] not in states_procs:
-                states_procs[line[1]] = []
-            states_procs[line[1]].append(line[0])
-
     p = {
-        'total': p_total,
+        'total': 0,
         'forks': forks_ps,
         'running': 0,
         'sleeping': 0,
@@ -284,17 +399,37 @@ def check_procs(warn=None, crit=None):
         'others': 0
     }
 
-    for state in states_procs:
-        if state == 'R':
-            p['running'] += len(states_procs[state])
-        elif state == 'S':
-            p['sleeping'] += len(states_procs[state])
-        elif state == 'D':
-            p['waiting'] += len(states_procs[state])
-        elif state == 'Z':
-            p['zombie'] += len(states_procs[state])
-        else:
-            p['others'] += len(states_procs[state])
+    proc_fd = os.open('/proc', os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        # d_type from getdents64 makes is_dir() free, and pid names are the only ones starting with a digit
+        with os.scandir(proc_fd) as it:
+            pids = [e.name for e in it if e.name[0] in '0123456789' and e.is_dir(follow_symlinks=False)]
+        p['total'] = len(pids)
+        states = bytearray()
+        # One buffer is reused for every pid instead of allocating a bytes object per read
+        buf = bytearray(512)
+        bufs = [buf]
+        # Bound once, as attribute lookups dominate this loop on hosts with many processes
+        os_open, os_readv, os_close, rdonly = os.open, os.readv, os.close, os.O_RDONLY
+        rfind, add_state = buf.rfind, states.append
+        for pid in pids:
+            try:
+                fd = os_open(f'{pid}/stat', rdonly, dir_fd=proc_fd)
+                try:
+                    n = os_readv(fd, bufs)
+                finally:
+                    os_close(fd)
+            except OSError:
+                continue
+            # The state follows the last ')', as comm may contain spaces and parentheses
+            i = rfind(b')', 0, n)
+            add_state(buf[i + 2])
+    finally:
+        os.close(proc_fd)
+
+    for state, x in PROC_STATES.items():
+        p[x] = states.count(state)
+    p['others'] = len(states) - sum(p[x] for x in PROC_STATES.values())
 
     status_outp += f"Total: {p['total']} Running: {p['running']} Sleeping: {p['sleeping']} Waiting: {p['waiting']} Zombie: {p['zombie']} Others: {p['others']} New_Forks: {p['forks']:.2f}/s"
 
@@ -303,10 +438,10 @@ def check_procs(warn=None, crit=None):
         param = ['total', 'running', 'waiting']
         for i in range(len(warn)):
             if crit[i] != '' and warn[i] != '':
-                if float(p[param[i]]) >= float(crit[i]):
+                if p[param[i]] >= crit_f[i]:
                     status_code = 2
                     status_outp += f" (Critical {param[i]})"
-                elif float(p[param[i]]) >= float(warn[i]):
+                elif p[param[i]] >= warn_f[i]:
                     if status_code < 1:
                         status_code = 1
                     status_outp += f" (Warning {param[i]})"
@@ -315,18 +450,19 @@ def check_procs(warn=None, crit=None):
     else:
         status_code = 0
 
+    parts = []
     seq = 0
     for x in ['total', 'forks', 'sleeping', 'running', 'waiting', 'zombie', 'others']:
-        perfdata += f"{x}={p[x]:.2f}"
+        item = f"{x}={p[x]:.2f}"
         if warn is not None and crit is not None:
             if x in ['total', 'running', 'waiting']:
                 if len(warn) >= seq + 1:
-                    perfdata += f";{warn[seq]};{crit[seq]}"
+                    item += f";{warn[seq]};{crit[seq]}"
                     seq += 1
-        perfdata += ' '
+        parts.append(item)
 
-    perfdata = perfdata.strip()
-    shutil.copyfile('/proc/stat', interim_file)
+    perfdata = ' '.join(parts)
+    write_snapshot(interim_file, f"{curr_forks}\n".encode())
 
     print(f"{status_outp} | {perfdata}")
     sys.exit(status_code)
@@ -335,6 +471,8 @@ def check_diskio(dev, warn=None, crit=None):
     status_code = 3
     status_outp = ''
     perfdata = ''
+    warn_f = parse_threshold(warn)
+    crit_f = parse_threshold(crit)
 
     if dev.startswith('/'):
         real_path = os.path.realpath(dev)
@@ -346,53 +484,46 @@ def check_diskio(dev, warn=None, crit=None):
     else:
         device = dev
 
-    with open('/proc/diskstats', 'r') as f2:
-        proc_content = f2.read()
+    proc_content = read_file('/proc/diskstats')
 
-    sep = f"{device} "
-    found = False
-    for line in proc_content.splitlines():
-        if sep in line:
-            found = True
-            proc_line = line.strip().split(sep)[1].split()
-            break
+    sep = f"{device} ".encode()
+    proc_line = find_line(proc_content, sep)
 
-    if not found:
+    if proc_line is None:
         print(f"Plugin Error: Block device not found: ({device})")
         sys.exit(3)
 
     interim_file = os.path.join(INTERIM_DIR, f'proc_diskstats_{device.replace("/", "_")}')
-    if not os.path.isfile(interim_file):
-        shutil.copyfile('/proc/diskstats', interim_file)
-        print(f"This was the first run, run again to get values: diskio({device})")
-        sys.exit(0)
-
-    sample_period = float(time.time() - os.path.getmtime(interim_file))
-
-    with open(interim_file, 'r') as f1:
-        interim_content = f1.read()
+    interim = read_snapshot(interim_file)
+    if interim is None:
+        if warn is not None and crit is not None:
+            write_snapshot(interim_file, proc_content)
+            print(f"This was the first run, run again to get values: diskio({device})")
+            sys.exit(0)
+        # Without thresholds report zeros right away; the snapshot is written below
+        interim = (0.0, proc_content)
 
-    for line in interim_content.splitlines():
-        if sep in line:
-            interim_line = line.strip().split(sep)[1].split()
-            break
+    sample_period, interim_content = interim
+    per_second = 1 / sample_period if sample_period else 0
+    interim_line = find_line(interim_content, sep)
 
+    deltas = counter_deltas(counters(proc_line, sep), counters(interim_line, sep))
     d = {
-        'read_operations': (int(proc_line[0]) - int(interim_line[0])) / sample_period,
-        'read_sectors': (int(proc_line[2]) - int(interim_line[2])) / sample_period,
-        'read_time': (int(proc_line[3]) - int(interim_line[3])) / sample_period,
-        'write_operations': (int(proc_line[4]) - int(interim_line[4])) / sample_period,
-        'write_sectors': (int(proc_line[6]) - int(interim_line[6])) / sample_period,
-        'write_time': (int(proc_line[7]) - int(interim_line[7])) / sample_period
+        'read_operations': deltas[0] * per_second,
+        'read_sectors': deltas[2] * per_second,
+        'read_time': deltas[3] * per_second,
+        'write_operations': deltas[4] * per_second,
+        'write_sectors': deltas[6] * per_second,
+        'write_time': deltas[7] * per_second
     }
 
     status_outp += f"{dev} ({device}) Read: {d['read_sectors']:.2f} sec/s ({d['read_operations']:.2f} t/s) Write: {d['write_sectors']:.2f} sec/s ({d['write_operations']:.2f} t/s) [t:{sample_period:.2f}]"
 
     if warn is not None and crit is not None:
-        if float(d['read_sectors']) >= float(crit[0]) or float(d['write_sectors']) >= float(crit[1]):
+        if d['read_sectors'] >= crit_f[0] or d['write_sectors'] >= crit_f[1]:
             status_code = 2
             status_outp += ' (Critical)'
-        elif float(d['read_sectors']) >= float(warn[0]) or float(d['write_sectors']) >= float(warn[1]):
+        elif d['read_sectors'] >= warn_f[0] or d['write_sectors'] >= warn_f[1]:
             status_code = 1
             status_outp += ' (Warning)'
         else:
@@ -401,17 +532,18 @@ def check_diskio(dev, warn=None, crit=None):
     else:
         status_code = 0
 
+    parts = []
     for x in ['read_operations', 'read_sectors', 'read_time', 'write_operations', 'write_sectors', 'write_time']:
-        perfdata += f"{x}={d[x]:.2f}"
+        item = f"{x}={d[x]:.2f}"
         if warn is not None and crit is not None:
             if x == 'read_sectors':
-                perfdata += f";{warn[0]};{crit[0]}"
+                item += f";{warn[0]};{crit[0]}"
             elif x == 'write_sectors':
-                perfdata += f";{warn[1]};{crit[1]}"
-        perfdata += ' '
+                item += f";{warn[1]};{crit[1]}"
+        parts.append(item)
 
-    perfdata = perfdata.strip()
-    shutil.copyfile('/proc/diskstats', interim_file)
+    perfdata = ' '.join(parts)
+    write_snapshot(interim_file, proc_content)
 
     print(f"{status_outp} | {perfdata}")
     sys.exit(status_code)
@@ -420,6 +552,8 @@ def check_disku(mount, warn=None, crit=None):
     status_code = 3
     status_outp = ''
     perfdata = ''
+    warn_f = parse_threshold(warn)
+    crit_f = parse_threshold(crit)
 
     if os.path.ismount(mount):
         statvfs = os.statvfs(mount)
@@ -437,10 +571,10 @@ def check_disku(mount, warn=None, crit=None):
     status_outp += f"{mount} Used: {du['size'] - du['avail']:.2f} GB / {du['size']:.2f} GB ({du['used_pc']:.2f}%)"
 
     if warn is not None and crit is not None:
-        if du['used_pc'] >= float(crit):
+        if du['used_pc'] >= crit_f:
             status_code = 2
             status_outp += ' (Critical)'
-        elif du['used_pc'] >= float(warn):
+        elif du['used_pc'] >= warn_f:
             status_code = 1
             status_outp += ' (Warning)'
         else:
@@ -460,20 +594,17 @@ def check_memory(warn=None, crit=None):
     status_code = 3
     status_outp = ''
     perfdata = ''
-    mem = {}
-
-    with open('/proc/meminfo', 'r') as f:
-        for line in f:
-            if line.startswith('MemTotal: '):
-                mem['total'] = int(line.split()[1])
-            elif line.startswith('Active: '):
-                mem['active'] = int(line.split()[1])
-            elif line.startswith('MemFree: '):
-                mem['free'] = int(line.split()[1])
-            elif line.startswith('Cached: '):
-                mem['cached'] = int(line.split()[1])
-            elif line.startswith('Buffers: '):
-                mem['buffers'] = int(line.split()[1])
+    warn_f = parse_threshold(warn)
+    crit_f = parse_threshold(crit)
+
+    meminfo = read_meminfo('MemTotal', 'Active', 'MemFree', 'Cached', 'Buffers')
+    mem = {
+        'total': meminfo['MemTotal'],
+        'active': meminfo['Active'],
+        'free': meminfo['MemFree'],
+        'cached': meminfo['Cached'],
+        'buffers': meminfo['Buffers']
+    }
 
     m = {
         'total': float(mem['total'] / 1024.00),
@@ -486,10 +617,10 @@ def check_memory(warn=None, crit=None):
     status_outp += f"Memory Used: {m['used']:.2f}MB / {m['total']:.2f}MB ({m['used_p']:.2f}%)"
 
     if warn is not None and crit is not None:
-        if m['used_p'] >= float(crit):
+        if m['used_p'] >= crit_f:
             status_code = 2
             status_outp += ' (Critical)'
-        elif m['used_p'] >= float(warn):
+        elif m['used_p'] >= warn_f:
             status_code = 1
             status_outp += ' (Warning)'
         else:
@@ -498,19 +629,20 @@ def check_memory(warn=None, crit=None):
     else:
         status_code = 0
 
+    parts = []
     for x in ['used', 'cached', 'active']:
-        perfdata += f"{x}={m[x]:.2f}"
+        item = f"{x}={m[x]:.2f}"
         if x == 'used':
             if warn is not None and crit is not None:
-                warn_mb = int(m['total'] * float(warn) / 100)
-                crit_mb = int(m['total'] * float(crit) / 100)
-                perfdata += f";{warn_mb};{crit_mb}"
+                warn_mb = int(m['total'] * warn_f / 100)
+                crit_mb = int(m['total'] * crit_f / 100)
+                item += f";{warn_mb};{crit_mb}"
             else:
-                perfdata += ';;'
-            perfdata += f";0;{int(m['total'])}"
-        perfdata += ' '
+                item += ';;'
+            item += f";0;{int(m['total'])}"
+        parts.append(item)
 
-    perfdata = perfdata.strip()
+    perfdata = ' '.join(parts)
 
     print(f"{status_outp} | {perfdata}")
     sys.exit(status_code)
@@ -519,16 +651,15 @@ def check_swap(warn=None, crit=None):
     status_code = 3
     status_outp = ''
     perfdata = ''
-    swap = {}
-
-    with open('/proc/meminfo', 'r') as f:
-        for line in f:
-            if line.startswith('SwapTotal: '):
-                swap['total'] = int(line.split()[1])
-            elif line.startswith('SwapFree: '):
-                swap['free'] = int(line.split()[1])
-            elif line.startswith('SwapCached: '):
-                swap['cached'] = int(line.split()[1])
+    warn_f = parse_threshold(warn)
+    crit_f = parse_threshold(crit)
+
+    meminfo = read_meminfo('SwapTotal', 'SwapFree', 'SwapCached')
+    swap = {
+        'total': meminfo['SwapTotal'],
+        'free': meminfo['SwapFree'],
+        'cached': meminfo['SwapCached']
+    }
 
     if swap['total'] == 0:
         status_outp = "No swap space configured on this system"
@@ -546,10 +677,10 @@ def check_swap(warn=None, crit=None):
     status_outp += f"Swap Used: {s['used']:.2f}MB / {s['total']:.2f}MB ({s['used_p']:.2f}%)"
 
     if warn is not None and crit is not None:
-        if s['used_p'] >= float(crit):
+        if s['used_p'] >= crit_f:
             status_code = 2
             status_outp += ' (Critical)'
-        elif s['used_p'] >= float(warn):
+        elif s['used_p'] >= warn_f:
             status_code = 1
             status_outp += ' (Warning)'
         else:
@@ -558,19 +689,20 @@ def check_swap(warn=None, crit=None):
     else:
         status_code = 0
 
+    parts = []
     for x in ['used', 'cached']:
-        perfdata += f"{x}={s[x]:.2f}"
+        item = f"{x}={s[x]:.2f}"
         if x == 'used':
             if warn is not None and crit is not None:
-                warn_mb = int(s['total'] * float(warn) / 100)
-                crit_mb = int(s['total'] * float(crit) / 100)
-                perfdata += f";{warn_mb};{crit_mb}"
+                warn_mb = int(s['total'] * warn_f / 100)
+                crit_mb = int(s['total'] * crit_f / 100)
+                item += f";{warn_mb};{crit_mb}"
             else:
-                perfdata += ';;'
-            perfdata += f";0;{int(s['total'])}"
-        perfdata += ' '
+                item += ';;'
+            item += f";0;{int(s['total'])}"
+        parts.append(item)
 
-    perfdata = perfdata.strip()
+    perfdata = ' '.join(parts)
 
     print(f"{status_outp} | {perfdata}")
     sys.exit(status_code)
@@ -579,78 +711,74 @@ def check_net(interface, warn=None, crit=None):
     status_code = 0
     status_outp = ''
     perfdata = ''
+    warn_f = parse_threshold(warn)
+    crit_f = parse_threshold(crit)
+
+    proc_content = read_file('/proc/net/dev')
 
     interim_file = os.path.join(INTERIM_DIR, f'proc_net_dev_{interface}')
-    if not os.path.isfile(interim_file):
-        shutil.copyfile('/proc/net/dev', interim_file)
-        print(f"This was the first run, run again to get values: net:{interface}")
-        sys.exit(0)
+    interim = read_snapshot(interim_file)
+    if interim is None:
+        if warn is not None and crit is not None:
+            write_snapshot(interim_file, proc_content)
+            print(f"This was the first run, run again to get values: net:{interface}")
+            sys.exit(0)
+        # Without thresholds report zeros right away; the snapshot is written below
+        interim = (0.0, proc_content)
 
-    sample_period = float(time.time() - os.path.getmtime(interim_file))
-
-    int_t = {}
-    int_d = {}
-
-    for file in ['/proc/net/dev', interim_file]:
-        with open(file, 'r') as f:
-            for line in f:
-                line = line.strip()
-                if line.startswith(f"{interface}:"):
-                    seq = 0
-                    for x in [
-                        'r_bytes', 'r_packets', 'r_errs', 'r_drop', 'r_fifo', 'r_frame', 'r_compressed', 'r_multicast',
-                        't_bytes', 't_packets', 't_errs', 't_drop', 't_fifo', 't_colls', 't_carrier', 't_compressed'
-                    ]:
-                        if file == '/proc/net/dev':
-                            int_t[x] = int(line.split(f"{interface}:")[1].split()[seq])
-                        elif file == interim_file:
-                            interim_value = int(line.split(f"{interface}:")[1].split()[seq])
-                            int_d[x] = int_t[x] - interim_value
-                        seq += 1
-                    break
-
-    if not int_t or not int_d:
+    sample_period, interim_content = interim
+    per_second = 1 / sample_period if sample_period else 0
+
+    key = f"{interface}:".encode()
+    int_c = [find_line(content, key) for content in [proc_content, interim_content]]
+
+    if None in int_c:
         print(f"Plugin Error: Network device not found: ({interface})")
         sys.exit(3)
 
-    int_d['RX_MBps'] = float(int_d['r_bytes'] / 1024.00 / 1024.00 / sample_period)
-    int_d['TX_MBps'] = float(int_d['t_bytes'] / 1024.00 / 1024.00 / sample_period)
-    int_d['RX_PKps'] = float(int_d['r_packets'] / sample_period)
-    int_d['TX_PKps'] = float(int_d['t_packets'] / sample_period)
+    # Positions as in /proc/net/dev: 0 r_bytes, 1 r_packets, 8 t_bytes, 9 t_packets
+    deltas = counter_deltas(counters(int_c[0], key), counters(int_c[1], key))
+    int_d = {
+        'RX_MBps': deltas[0] / 1024.00 / 1024.00 * per_second,
+        'TX_MBps': deltas[8] / 1024.00 / 1024.00 * per_second,
+        'RX_PKps': deltas[1] * per_second,
+        'TX_PKps': deltas[9] * per_second
+    }
 
     status_outp += f"{interface} Rx: {int_d['RX_MBps']:.2f} MB/s ({int_d['RX_PKps']:.2f} p/s)"
     status_outp += f" Tx: {int_d['TX_MBps']:.2f} MB/s ({int_d['TX_PKps']:.2f} p/s)"
     status_outp += f" [t:{sample_period:.2f}]"
 
     int_d['PK_ERRORS'] = 0
-    for x in ['r_errs', 'r_drop', 'r_fifo', 'r_frame', 't_errs', 't_drop', 't_fifo', 't_colls', 't_carrier']:
-        if float(int_d[x]) > 0:
-            int_d['PK_ERRORS'] += int_d[x]
+    for i, x in NET_ERROR_FIELDS.items():
+        if deltas[i] > 0:
+            int_d['PK_ERRORS'] += deltas[i]
             status_code = 2
-            status_outp += f" (Critical {x}:{int_d[x]})"
+            status_outp += f" (Critical {x}:{deltas[i]})"
 
     if warn is not None and crit is not None and int_d['PK_ERRORS'] == 0:
-        if float(int_d['RX_MBps']) >= float(crit[0]) or float(int_d['TX_MBps']) >= float(crit[1]):
+        if int_d['RX_MBps'] >= crit_f[0] or int_d['TX_MBps'] >= crit_f[1]:
             status_code = 2
             status_outp += ' (Critical BW)'
-        elif float(int_d['RX_MBps']) >= float(warn[0]) or float(int_d['TX_MBps']) >= float(warn[1]):
+        elif int_d['RX_MBps'] >= warn_f[0] or int_d['TX_MBps'] >= warn_f[1]:
             if status_code < 1:
                 status_code = 1
             status_outp += ' (Warning BW)'
         else:
             status_outp += ' (OK)'
 
+    parts = []
     for x in ['RX_MBps', 'RX_PKps', 'TX_MBps', 'TX_PKps', 'PK_ERRORS']:
-        perfdata += f"{x}={int_d[x]:.2f}"
+        item = f"{x}={int_d[x]:.2f}"
         if warn is not None and crit is not None:
             if x == 'RX_MBps':
-                perfdata += f";{warn[0]};{crit[0]}"
+                item += f";{warn[0]};{crit[0]}"
             elif x == 'TX_MBps':
-                perfdata += f";{warn[1]};{crit[1]}"
-        perfdata += ' '
+                item += f";{warn[1]};{crit[1]}"
+        parts.append(item)
 
-    perfdata = perfdata.strip()
-    shutil.copyfile('/proc/net/dev', interim_file)
+    perfdata = ' '.join(parts)
+    write_snapshot(interim_file, proc_content)
 
     print(f"{status_outp} | {perfdata}")
     sys.exit(status_code)